@@ -11,15 +11,16 @@ import numpy as np
 def masked_to_nan(arg):
     """
     Convert a masked array to a float ndarray with nans; ensure
-    other arguments are float arrays or scalars.
+    other arguments are float arrays or scalars. Arrays are returned
+    C-contiguous so ufuncs take their unit-stride loops.
     """
     if np.ma.isMaskedArray(arg):
         if arg.dtype.kind == 'f':
-            return arg.filled(np.nan)
+            return np.asarray(arg.filled(np.nan), order='C')
         else:
-            return arg.astype(float).filled(np.nan)
+            return np.asarray(arg.astype(float).filled(np.nan), order='C')
     else:
-        return np.asarray(arg, dtype=float)
+        return np.asarray(arg, dtype=float, order='C')
 
 def match_args_return(f):
     """
@@ -32,8 +33,14 @@ def match_args_return(f):
             args = list(args)
             args.append(p)
 
-        isarray = np.any([hasattr(a, '__iter__') for a in args])
-        ismasked = np.any([np.ma.isMaskedArray(a) for a in args])
+        # plain Python numbers (e.g. one bottle sample at a time) skip the
+        # array and mask checks and become numpy float64 scalars directly
+        isscalar = all(type(a) is float or type(a) is int for a in args)
+        if isscalar:
+            isarray = ismasked = False
+        else:
+            isarray = np.any([hasattr(a, '__iter__') for a in args])
+            ismasked = np.any([np.ma.isMaskedArray(a) for a in args])
 
         def fixup(ret):
             if ismasked:
@@ -42,10 +49,14 @@ def match_args_return(f):
                 ret = ret[0]
             return ret
 
-        if ismasked:
+        if isscalar:
+            newargs = [np.float64(a) for a in args]
+        elif ismasked:
             newargs = [masked_to_nan(a) for a in args]
         else:
-            newargs = [np.asarray(a, dtype=float) for a in args]
+            # C order: transposed or Fortran ordered inputs would otherwise
+            # mix layouts with the C ordered buffers of the kernels
+            newargs = [np.asarray(a, dtype=float, order='C') for a in args]
 
         if p is not None:
             kw['p'] = newargs.pop()
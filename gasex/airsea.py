@@ -6,7 +6,7 @@ Created on Mon Nov 20 14:55:36 2017
 @author: dnicholson
 """
 import numpy as np
-from gasex.phys import vpress_sw, R, cdlp81, atm2pa, K0
+from gasex.phys import vpress_sw, R, cdlp81, atm2pa, K0, SP2SA
 from gasex.diff import schmidt,diff
 from gasex.sol import sol_SP_pt,eq_SP_pt, air_mol_fract
 from gsw import rho, CT_from_pt
@@ -247,7 +247,7 @@ def L13(C,u10,SP,pt,*,slp=1.0,gas=None,rh=1.0,chi_atm=None):
     # -------------------------------------------------------------------------
     
     # Calculate potential density at surface
-    SA = SP * 35.16504 / 35
+    SA = SP * SP2SA
     CT = CT_from_pt(SA,pt)
     rhow = rho(SA,CT,0)
     rhoa = 1.225
@@ -50,17 +50,114 @@
 """
 from __future__ import division
 import numpy as np
-from ._utilities import match_args_return
+from ._utilities import match_args_return, masked_to_nan
 from gasex.phys import R as R 
+from gasex.phys import K0 as K0
 from gasex.phys import visc as visc
 
 
 # Currently supported gases
 # TODO: find N2O, CO diffusivities
-GAS_LIST = ('HE','NE','AR','KR','XE','N2','O2','CH4','N2','CO2')
+GAS_LIST = ('HE','NE','AR','KR','XE','N2','O2','CH4','CO2','H2')
+_VALID_GASES = frozenset(GAS_LIST)
+
+# Eyring equation coefficients for freshwater diffusivity, D0 = A exp(-Ea/RT)
+# stored as (A [m^2 s-1], Ea/R [K]) so each call is one lookup and one exp
+_AEa = {'O2': (4.286e-6, 18700 / R),
+        'HE': (0.8180e-6, 11700 / R),
+        'NE': (1.6080e-6, 14840 / R),
+        'AR': (2.227e-6, 16680 / R),
+        'KR': (6.3930e-6, 20200 / R),
+        'XE': (9.0070e-6, 21610 / R),
+        'N2': (3.4120e-6, 18500 / R),
+        'CH4': (3.0470e-6, 18360 / R),
+        'CO2': (5.0190e-6, 19510 / R),
+        'H2': (3.3380e-6, 16060 / R)}
+
+# Salinity correction, 4.9% decrease in diffusivity at 35.5 (Jahne et al.)
+_SAL_COEF = 0.049 / 35.5
+
+# The same coefficients as arrays indexed by position in GAS_LIST, for
+# evaluating many gases in one vectorized expression
+_GAS_ID = {g: i for i, g in enumerate(GAS_LIST)}
+_A = np.array([_AEa[g][0] for g in GAS_LIST])
+_EaR = np.array([_AEa[g][1] for g in GAS_LIST])
+
+
+def _arrhenius(SP,pt,A,EaR,out=None,invT=None):
+    """
+    Salinity-corrected Eyring diffusivity, A exp(-Ea/RT) (1 - 0.049 SP/35.5)
+
+    The exponent and exp are evaluated in place in a single output buffer
+    rather than allocating a new temporary for each step. If given, out is
+    used as that buffer, and invT = 1/(pt+K0) is used in place of pt so
+    callers evaluating several gases can compute it once.
+    """
+    shape = np.broadcast(SP,pt,A).shape
+    if out is None:
+        D = np.empty(shape, dtype=np.result_type(SP,pt))
+    elif out.shape != shape:
+        raise ValueError("out has shape " + str(out.shape) + \
+                         ", expected " + str(shape))
+    else:
+        D = out
+    #freshwater diffusivity
+    if invT is None:
+        np.add(pt, K0, out=D)
+        np.divide(-EaR, D, out=D)
+    else:
+        np.multiply(invT, -EaR, out=D)
+    np.exp(D, out=D)
+    #prefactor and salinity correction folded into one pass, A - (A c) SP
+    D *= A - (A * _SAL_COEF) * SP
+    return D if D.ndim else D[()]
+
+
+def _gas_key(gas):
+    """
+    Upper-case gas name, raising ValueError for unsupported or non-string gas
+    """
+    g_up = gas.upper() if isinstance(gas, str) else None
+    if g_up not in _VALID_GASES:
+        raise ValueError("gas", gas, " does not match one of ", GAS_LIST)
+    return g_up
+
+
+def _make_diff(g_up):
+    """
+    Return a diffusivity function of (SP,pt) with the Eyring coefficients
+    for one gas bound in, so calls skip the table lookup
+    """
+    A, EaR = _AEa[g_up]
+
+    def diff_gas(SP,pt,out=None,invT=None):
+        return _arrhenius(SP,pt,A,EaR,out,invT)
+    diff_gas.__doc__ = """
+    Diffusion coefficient of %s in fresh/sea water [m^2 s-1] as a function
+    of practical salinity SP and temperature pt [degree C]; see diff
+    """ % g_up
+    return diff_gas
+
+
+# Per-gas diffusivity functions, built once at import
+_DIFF_FUNCS = {g: _make_diff(g) for g in _AEa}
+
+# Public per-gas versions that broadcast over array-like SP and pt without
+# the gas keyword, e.g. diff_O2(SP,pt)
+diff_He = match_args_return(_DIFF_FUNCS['HE'])
+diff_Ne = match_args_return(_DIFF_FUNCS['NE'])
+diff_Ar = match_args_return(_DIFF_FUNCS['AR'])
+diff_Kr = match_args_return(_DIFF_FUNCS['KR'])
+diff_Xe = match_args_return(_DIFF_FUNCS['XE'])
+diff_N2 = match_args_return(_DIFF_FUNCS['N2'])
+diff_O2 = match_args_return(_DIFF_FUNCS['O2'])
+diff_CH4 = match_args_return(_DIFF_FUNCS['CH4'])
+diff_CO2 = match_args_return(_DIFF_FUNCS['CO2'])
+diff_H2 = match_args_return(_DIFF_FUNCS['H2'])
+
 
 @match_args_return
-def diff(SP,pt,*,gas=None):
+def diff(SP,pt,*,gas=None,dtype=None,out=None,invT=None):
     
     """
     DESCRIPTION
@@ -71,45 +168,137 @@ def diff(SP,pt,*,gas=None):
     -----------
       SP = practical salinity       [PSS-78]
       pt = temperature               [degree C]
-      gas = 'He','Ne','Ar','Kr','Xe','N2','O2','CH4','N2' or 'CO2'
+      gas = 'He','Ne','Ar','Kr','Xe','N2','O2','CH4','CO2' or 'H2'
+      dtype = optional floating dtype for the calculation, e.g. np.float32.
+              The diffusivity fits are good to a few percent, so single
+              precision (relative error ~1e-6) halves memory traffic on
+              large grids at no practical cost in accuracy.
+      out = optional preallocated array to write the result into
+      invT = optional precomputed 1/(pt+273.15), to share across calls for
+             several gases at the same pt
     
     OUTPUT:
       D = diffusion coefficient     [m^2 s-1]
 
     """
-    g_up = gas.upper()
-    if g_up not in GAS_LIST:
-        raise ValueError("gas: must be one of ", GAS_LIST)
-        
-    AEa_dict = {'O2': (4.286e-6, 18700),\
-           'HE': (0.8180e-6, 11700),\
-           'NE': (1.6080e-6, 14840),\
-           'AR': (2.227e-6, 16680),\
-           'KR': (6.3930e-6, 20200),\
-           'XE': (9.0070e-6, 21610),\
-           'N2': (3.4120e-6, 18500),\
-           'CH4':(3.0470e-6, 18360),\
-           'CO2':(5.0190e-6, 19510),\
-           'H2': (3.3380e-6, 16060)}
-           
-    if g_up in AEa_dict.keys():
-        #freshwater diffusivity
-        AEa = AEa_dict[g_up]
-        D0 = AEa[0] * np.exp(-AEa[1] / (R * (pt+273.15)))
-        #salinity correction
-        D = D0 * (1 - 0.049 * SP / 35.5)
-    elif gas == 'CO2':
-        #CO2 schmidt# formula from Wanninkhof (1992)
-        D = visc(SP,pt) / schmidt(SP,pt,'CO2')
-    return D
+    g_up = _gas_key(gas)
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+    return _DIFF_FUNCS[g_up](SP,pt,out,invT)
+
+
+@match_args_return
+def diff_idx(SP,pt,gid):
+    """
+    DESCRIPTION
+    -----------
+       Diffusion coefficients for gases selected by integer id, so that
+       many gases can be evaluated in one broadcast expression without a
+       Python-level branch per gas
+
+    PARAMETERS
+    -----------
+      SP = practical salinity       [PSS-78]
+      pt = temperature               [degree C]
+      gid = integer array of gas ids, the position of each gas in GAS_LIST;
+            broadcast against SP and pt
+
+    OUTPUT:
+      D = diffusion coefficient     [m^2 s-1]
+    """
+    # match_args_return passes gid on as floats
+    gid = gid.astype(int)
+    return _arrhenius(SP,pt,_A[gid],_EaR[gid])
+
+
+def diff_grid(SP,pt,*,gases=GAS_LIST,out=None):
+    """
+    DESCRIPTION
+    -----------
+       Diffusion coefficients of several gases on a common SP/pt grid,
+       evaluated as a single (gas, ...) array in one in-place pass
+
+    PARAMETERS
+    -----------
+      SP = practical salinity       [PSS-78]
+      pt = temperature               [degree C]
+      gases = sequence of gas names (default GAS_LIST)
+      out = optional preallocated array of shape (len(gases), ...) to write
+            the result into
+
+    OUTPUT:
+      D = diffusion coefficients, first axis ordered as gases   [m^2 s-1]
+          (masked where SP or pt are masked)
+    """
+    ismasked = np.ma.isMaskedArray(SP) or np.ma.isMaskedArray(pt)
+    SP = masked_to_nan(SP)
+    pt = masked_to_nan(pt)
+    # gas ids as a (n_gas, 1, ...) column that broadcasts against SP/pt
+    gid = np.array([_GAS_ID[_gas_key(g)] for g in gases])
+    gid = gid.reshape((-1,) + (1,) * np.broadcast(SP,pt).ndim)
+    # 1/T is shared by all gases, so compute it once on the pt grid
+    invT = 1.0 / (pt+K0)
+    D = _arrhenius(SP,pt,_A[gid],_EaR[gid],out,invT)
+    return np.ma.masked_invalid(D) if ismasked else D
 
 
 @match_args_return
-def schmidt(SP,pt,*,gas=None):
-    g_up = gas.upper()
-    if g_up not in GAS_LIST:
-        raise ValueError("gas", g_up, " does not match one of ", GAS_LIST)
+def schmidt(SP,pt,*,gas=None,dtype=None,fast=False,out=None):
+    """
+    DESCRIPTION
+    -----------
+       Schmidt number of a gas in fresh/sea water, the kinematic viscosity
+       divided by the diffusion coefficient
+
+    PARAMETERS
+    -----------
+      SP = practical salinity       [PSS-78]
+      pt = temperature               [degree C]
+      gas = 'He','Ne','Ar','Kr','Xe','N2','O2','CH4','CO2' or 'H2'
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+      fast = use the polynomial surface density in visc instead of gsw
+      out = optional preallocated array to write the result into. With
+            masked SP or pt the result is a new masked array rather than
+            out; out still receives the values, NaN where masked
+
+    OUTPUT:
+      Sc = Schmidt number           [dimensionless]
+    """
+    _gas_key(gas)
         
-    Sc = visc(SP,pt) / diff(SP,pt,gas=gas) 
-    return Sc
+    # out, if given, receives the result; callers can also preallocate the
+    # intermediate buffers via visc(..., out=) and diff(..., out=)
+    Sc = np.divide(visc(SP,pt,dtype=dtype,fast=fast),
+                   diff(SP,pt,gas=gas,dtype=dtype), out=out)
+    return Sc if Sc.ndim else Sc[()]
+
+
+def schmidt_all(SP,pt,*,gases=GAS_LIST,fast=False):
+    """
+    DESCRIPTION
+    -----------
+       Schmidt numbers of several gases at once. Viscosity is computed once
+       and divided by the diffusivities of all gases, evaluated together
+       on a (gas, SP/pt) array, rather than once per gas as in schmidt.
+
+    PARAMETERS
+    -----------
+      SP = practical salinity       [PSS-78]
+      pt = temperature               [degree C]
+      gases = sequence of gas names (default GAS_LIST)
+      fast = use the polynomial surface density in visc instead of gsw
+
+    OUTPUT:
+      Sc = dict of Schmidt number arrays keyed by gas (masked where SP or
+           pt are masked)
+    """
+    ismasked = np.ma.isMaskedArray(SP) or np.ma.isMaskedArray(pt)
+    SP = masked_to_nan(SP)
+    pt = masked_to_nan(pt)
 
+    Sc = diff_grid(SP,pt,gases=gases)
+    np.divide(visc(SP,pt,fast=fast), Sc, out=Sc)
+    if ismasked:
+        Sc = np.ma.masked_invalid(Sc)
+    return dict(zip(gases, Sc))
@@ -9,18 +9,252 @@ Functions for calculating dissolved gas solubility
 """
 
 from __future__ import division
+import math
+from collections import namedtuple
 import numpy as np
 from gsw import pt_from_CT,SP_from_SA,CT_from_pt,rho
-from ._utilities import match_args_return
+from ._utilities import match_args_return, masked_to_nan
 from gasex.phys import K0 as K0
-from gasex.phys import vpress_sw, R
+from gasex.phys import vpress_sw, R, SP2SA
 
 
 
 __all__ = ['O2sol_SP_pt','Hesol_SP_pt','Nesol_SP_pt','Arsol_SP_pt', \
            'Krsol_SP_pt','N2sol_SP_pt','N2Osol_SP_pt','O2sol','Hesol', \
-           'Nesol','Arsol','Krsol','N2sol','N2Osol']
+           'Nesol','Arsol','Krsol','N2sol','N2Osol','solubilities', \
+           'make_sol_at_SP']
+
+
+# Solubility fit coefficients, a for the temperature terms and b for the
+# salinity terms of each gas, defined once at import
+
+# Second column of Table 1 of Garcia and Gordon (1992) for fit to Benson and
+# Krause (1984)
+_O2_A = (5.80871, 3.20291, 4.17887, 5.10006, -9.86643e-2, 3.80369)
+_O2_B = (-7.01577e-3, -7.70028e-3, -1.13864e-2, -9.51519e-3)
+_O2_C = -2.75915e-7
+
+# Table 3 of Weiss (1971)
+_HE_A = (-167.2178, 216.3442, 139.2032, -22.6202)
+_HE_B = (-0.044781, 0.023541, -0.0034266)
+# mL kg-1 to umol kg-1 (1000 / molar volume at STP of Dymond and Smith, 1980)
+# folded into a0 as its log, saving a pass over the result
+_HE_A_UMOL = (_HE_A[0] + math.log(1000 / 22.4263),) + _HE_A[1:]
+
+# Table 4 of Hamme and Emerson (2004)
+_NE_A = (2.18156, 1.29108, 2.12504)
+_NE_B = (-5.94737e-3, -5.13896e-3)
+# nmol kg-1 to umol kg-1 for consistency with other gases, folded into a0
+_NE_A_UMOL = (_NE_A[0] - math.log(1e3),) + _NE_A[1:]
+_AR_A = (2.79150, 3.17609, 4.13116, 4.90379)
+_AR_B = (-6.96233e-3, -7.66670e-3, -1.16888e-2)
+_N2_A = (6.42931, 2.92704, 4.32531, 4.69149)
+_N2_B = (-7.44129e-3, -8.02566e-3, -1.46775e-2)
+
+# Table 2 (Weiss and Kyser, 1978)
+_KR_A = (-112.6840, 153.5817, 74.4690, -10.0189)
+_KR_B = (-0.011213, -0.001844, 0.0011201)
+# mL kg-1 to umol kg-1 (1/22.3511e-3, Dymond and Smith, 1980), folded into a0
+_KR_A_UMOL = (_KR_A[0] + math.log(4.474052731185490e1),) + _KR_A[1:]
+
+# from fit procedure of Hamme and Emerson 2004 to Wood and Caputi data
+_XE_A = (-7.48588, 5.08763, 4.22078)
+_XE_B = (-8.17791e-3, -1.20172e-2)
+
+# Table 2 of Weiss and Price (1980), K0 in mol L-1 atm-1
+_N2O_A = (-62.7062, 97.3066, 24.1406)
+_N2O_B = (-0.058420, 0.033193, -0.0051313)
+# Table 2 of Weiss and Price (1980), F in mol L-1 atm-1
+# a = (-165.8806, 222.8743, 92.0792, -1.48425)
+# b = (-0.056235, 0.031619, -0.0048472)
+# Table 2 of Weiss and Price (1980), F in mol kg-1 atm-1
+# a = (-168.2459, 226.0894, 93.2817, -1.48693)
+# b = (-0.060361, 0.033765, -0.0051862)
+# Moist air correction at 1 atm. Weiss and Price fitted the vapor pressure of
+# water as given by Goff and Gratch (1946), and the vapor pressure lowering by
+# sea salt as given by Robinson (1954), to a polynomial in temperature and
+# salinity:
+_N2O_M = (24.4543, 67.4509, 4.8489, 0.000544)
+
+# Table 1 (Weiss 1974, Marine Chem)
+_CO2_A = (-58.0931, 90.5069, 22.2940)
+_CO2_B = (0.027766, -0.025888, 0.0050578)
+# Table 6 (Weiss and Price, 1980)
+# a = (-162.8301, 218.2968, 90.9241, -1.47696)
+# b = (0.025695, -0.025225, 0.0049867)
+
+# Table 1 in Weisenburg and Guinasso 1979
+_CH4_A = (-68.8862, 101.4956, 28.7314)
+_CH4_B = (-0.076146, 0.043970, -0.0068672)
+# Bunsen coefficient to mol L-1 atm-1 (divided by the gas virial volume),
+# folded into a0
+_CH4_A_MOL = (_CH4_A[0] - math.log(22.360),) + _CH4_A[1:]
+_CO_A = (-47.6148, 69.5068, 18.7397)
+_CO_B = (0.045657, -0.040721, 0.0079700)
+_H2_A = (-47.8948, 65.0368, 20.1709)
+_H2_B = (-0.082225, 0.049564, -0.0078689)
+_H2_A_MOL = (_H2_A[0] - math.log(22.428),) + _H2_A[1:]
+
+
+def _horner(y, c, out):
+    """
+    Evaluate the polynomial sum(c[i] * y**i) by Horner's rule in place in
+    out, without allocating a temporary at each step.
+
+    Horner is preferred to Estrin's scheme here: each step is a separate
+    whole-array ufunc pass, so there is no serial latency chain for Estrin
+    to break up, while Estrin would need an extra y**2 buffer and as many
+    or more passes over memory.
+    """
+    out[...] = c[-1]
+    for ci in c[-2::-1]:
+        out *= y
+        out += ci
+    return out
+
+
+# Scalar kernels: a single SP, pt pair is evaluated with the math module on
+# Python floats, which costs far less than dispatching each step of the
+# array kernels as a ufunc on 0-d arrays. Results are returned as np.float64
+# like those of the array kernels.
+
+def _is_scalar64(v):
+    """True for a 0-d float64 array or numpy float64 scalar."""
+    return v.ndim == 0 and v.dtype == np.float64
+
+
+def _horner_scalar(y, c):
+    """Scalar version of _horner, in the same order of operations."""
+    r = c[-1]
+    for ci in c[-2::-1]:
+        r = r * y + ci
+    return r
+
+
+def _gg_y(t):
+    """
+    Scaled temperature y = ln((298.15 - t)/(273.15 + t)) of the Garcia and
+    Gordon (1992) fits, with t in deg C.
+
+    Kept as the log of a quotient: ln(298.15 - t) - ln(273.15 + t) swaps
+    the division for a second, slower log and loses accuracy to
+    cancellation near t = 12.5, and log1p((25 - 2 t)/(273.15 + t)) still
+    needs the division and costs more than log for an error already far
+    below that of the fits.
+    """
+    if _is_scalar64(t):
+        t = float(t)
+        return math.log((25+K0 - t)/(K0 + t))
+    return np.log((25+K0 - t)/(K0 + t))
+
 
+def _gg_sol(x, y, a, b, c=0.0):
+    """
+    Solubility of the Garcia and Gordon (1992) form shared by O2, Ne, Ar,
+    Xe and N2, exp(A(y) + x * (B(y) + c * x)) with A and B polynomials in
+    the scaled temperature y. Evaluated in two buffers in place rather than
+    one temporary array per arithmetic operation.
+    """
+    if type(y) is float and _is_scalar64(x):
+        x = float(x)
+        return np.float64(math.exp(_horner_scalar(y, a)
+                                   + (_horner_scalar(y, b) + c * x) * x))
+    shape = np.broadcast(x,y).shape
+    dtype = np.result_type(x,y)
+    sol = _horner(y, a, np.empty(shape, dtype=dtype))
+    xb = _horner(y, b, np.empty(shape, dtype=dtype))
+    if c:
+        xb += c * x
+    xb *= x
+    sol += xb
+    np.exp(sol, out=sol)
+    return sol if sol.ndim else sol[()]
+
+
+def _multi_gas_sol(x, y, A, B, C):
+    """
+    Garcia and Gordon (1992) form solubility of several gases at once, with
+    the coefficients of each gas in a column of A and B (zero padded to a
+    common length) and in C. y is shared by all the gases, so it is passed
+    over once per polynomial term for the whole stack rather than once per
+    gas. Returns an array with the gases along the first axis.
+    """
+    shape = (A.shape[1],) + np.broadcast(x,y).shape
+    dtype = np.result_type(x,y)
+    # float64 coefficient arrays would run every step of a float32
+    # evaluation through the float64 loops and cast back, so match them to
+    # the data; the columns broadcast against the trailing data axes
+    A, B, C = (coef.astype(dtype, copy=False) for coef in (A, B, C))
+    bcast = (1,) * (len(shape) - 1)
+    sol = _horner(y, A.reshape(A.shape + bcast), np.empty(shape, dtype=dtype))
+    xb = _horner(y, B.reshape(B.shape + bcast), np.empty(shape, dtype=dtype))
+    if C.any():
+        xb += C.reshape(C.shape + bcast) * x
+    xb *= x
+    sol += xb
+    np.exp(sol, out=sol)
+    return sol
+
+
+_WeissTerms = namedtuple('_WeissTerms', ['y_100', 'inv_y_100', 'log_y_100'])
+
+
+def _weiss_terms(pt):
+    """
+    Temperature terms of the Weiss (1970) form, which depend on pt alone
+    and so can be shared by every Weiss form gas at the same pt.
+    """
+    # y_100 = (pt68 + K0) / 100 where pt68 = 1.00024 pt is the potential
+    # temperature on the 1968 International Practical Temperature Scale
+    # IPTS-68, built directly from pt; 100/y is its reciprocal, taken once
+    y_100 = pt * 1.00024e-2 + K0 * 1e-2
+    return _WeissTerms(y_100, np.reciprocal(y_100), np.log(y_100))
+
+
+def _weiss_sol(x, pt, a, b, terms=None):
+    """
+    Solubility of the Weiss (1970) form shared by He, Kr, N2O, CO2, CH4, CO
+    and H2, exp(a0 + a1 100/y + a2 ln(y/100) [+ a3 y/100] + x * B(y/100))
+    with y the IPTS-68 temperature in Kelvin and B a polynomial. Terms are
+    accumulated in place in the output buffer. terms, from _weiss_terms(pt),
+    may be passed in when several gases are evaluated at the same pt.
+    """
+    if terms is None and _is_scalar64(x) and _is_scalar64(pt):
+        return _weiss_sol_scalar(float(x), float(pt), a, b)
+    if terms is None:
+        terms = _weiss_terms(pt)
+    y_100, inv_y_100, log_y_100 = terms
+    if len(a) > 3:
+        a0, a1, a2, a3 = a
+    else:
+        a0, a1, a2 = a
+        a3 = None
+
+    sol = _horner(y_100, b, np.empty(np.broadcast(x,pt).shape,
+                                     dtype=np.result_type(x,pt)))
+    sol *= x
+    sol += a0
+    sol += a1 * inv_y_100
+    sol += a2 * log_y_100
+    if a3 is not None:
+        sol += a3 * y_100
+    np.exp(sol, out=sol)
+    return sol if sol.ndim else sol[()]
+
+
+def _weiss_sol_scalar(x, pt, a, b):
+    """Scalar version of _weiss_sol for Python float x and pt."""
+    y_100 = pt * 1.00024e-2 + K0 * 1e-2
+    if len(a) > 3:
+        a0, a1, a2, a3 = a
+    else:
+        a0, a1, a2 = a
+        a3 = None
+    sol = (_horner_scalar(y_100, b) * x + a0 + a1 * (1 / y_100)
+           + a2 * math.log(y_100))
+    if a3 is not None:
+        sol += a3 * y_100
+    return np.float64(math.exp(sol))
 
 
 @match_args_return
@@ -75,7 +309,7 @@ def eq_SP_pt(SP,pt,*,gas=None,slp=1.0,units="mM"):
                          N2")
     if units not in ("M","mM","uM","molm3","umolkg"):
         raise ValueError("units: units must be \'M\','uM' or \'umolkg\'")
-    SA = SP * 35.16504/35
+    SA = SP * SP2SA
     CT = CT_from_pt(SA,pt)
     dens = rho(SA,CT,0)
     if units == "M":
@@ -116,7 +350,7 @@ def sol_SP_pt(SP,pt,*,gas=None,p_dry=1.0,units="mM"):
     elif units =="mM" or units == "molm3":
         return p_dry * K0 * 1e3
     elif units == 'umolkg':
-        SA = SP * 35.16504/35
+        SA = SP * SP2SA
         CT = CT_from_pt(SA,pt)
         dens = rho(SA,CT,0)
         return 1e-3 * p_dry * K0 / dens
@@ -125,7 +359,7 @@ def sol_SP_pt(SP,pt,*,gas=None,p_dry=1.0,units="mM"):
 
 
 @match_args_return
-def O2sol_SP_pt(SP,pt):
+def O2sol_SP_pt(SP,pt,*,dtype=None):
 
     """
      O2sol_SP_pt                              solubility of O2 in seawater
@@ -150,6 +384,8 @@ def O2sol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
      OUTPUT:
       O2sol = solubility of oxygen in micro-moles per kg           [ umol/kg ]
@@ -182,25 +418,19 @@ def O2sol_SP_pt(SP,pt):
     """
 
 
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP        # Note that salinity argument is Practical Salinity, this is
              # beacuse the major ionic components of seawater related to Cl
           # are what affect the solubility of non-electrolytes in seawater.
 
     pt68 = pt * 1.00024     # pt68 is the potential temperature in degress C on
               # the 1968 International Practical Temperature Scale IPTS-68.
-    y = np.log((25+K0 - pt68)/(K0 + pt68))
+    y = _gg_y(pt68)
 
-# The coefficents below are from the second column of Table 1 of Garcia and
-# Gordon (1992) for fit to Benson and Krause (1984)
-    a = (5.80871,3.20291,4.17887,5.10006,-9.86643e-2,3.80369)
-    b = (-7.01577e-3,-7.70028e-3,-1.13864e-2,-9.51519e-3)
-    c = -2.75915e-7
-
-
-    lnC = (a[0] + y * (a[1] + y * (a[2] + y * (a[3] + y * (a[4] + a[5] * y))))\
-          + x * (b[0] + y * (b[1] + y * (b[2] + b[3] * y)) + c * x))
-
-    return np.exp(lnC)
+    return _gg_sol(x, y, _O2_A, _O2_B, _O2_C)
 
 
 @match_args_return
@@ -215,7 +445,7 @@ def O2sol(SA,CT,p,long,lat):
 
 
 @match_args_return
-def Hesol_SP_pt(SP,pt):
+def Hesol_SP_pt(SP,pt,*,dtype=None,_terms=None):
     """
      Hesol_SP_pt                              solubility of He in seawater
     ==========================================================================
@@ -237,6 +467,8 @@ def Hesol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
       SP & pt need to have the same dimensions.
 
@@ -264,25 +496,17 @@ def Hesol_SP_pt(SP,pt):
 
     ==========================================================================
     """
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP        # Note that salinity argument is Practical Salinity, this is
              # beacuse the major ionic components of seawater related to Cl
           # are what affect the solubility of non-electrolytes in seawater.
 
-    pt68 = pt * 1.00024 # pt68 is the potential temperature in degress C on
-                  # the 1968 International Practical Temperature Scale IPTS-68.
-    y = pt68 + K0
-    y_100 = y * 1e-2
-
-    # The coefficents below are from Table 3 of Weiss (1971)
-    a = (-167.2178, 216.3442, 139.2032, -22.6202)
-    b = (-0.044781, 0.023541, -0.0034266)
-
-    Hesol_mL = np.exp(a[0] + a[1] * 100/y + a[2] * np.log(y_100) + a[3] * \
-                      y_100 + x * (b[0] + y_100 * (b[1] + b[2] * y_100)))
-
-    Hesol = 1000* Hesol_mL / mol_vol(gas="He")
-    # mL/kg to umol/kg for He (1/22.44257e-3)
-    #Molar volume at STP (Dymond and Smith, 1980).
+    # umol/kg, the mL/kg to umol/kg conversion for He (1/22.4263e-3, molar
+    # volume at STP of Dymond and Smith, 1980) is folded into _HE_A_UMOL
+    Hesol = _weiss_sol(x, pt, _HE_A_UMOL, _HE_B, _terms)
     return Hesol
 
 
@@ -297,7 +521,7 @@ def Hesol(SA,CT,p,long,lat):
     return Hesol_SP_pt(SP,pt)
 
 @match_args_return
-def Nesol_SP_pt(SP,pt):
+def Nesol_SP_pt(SP,pt,*,dtype=None):
     """
      Nesol_SP_pt                              solubility of Ne in seawater
     ==========================================================================
@@ -319,6 +543,8 @@ def Nesol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
       SP & pt need to have the same dimensions.
 
@@ -343,20 +569,20 @@ def Nesol_SP_pt(SP,pt):
 
     ==========================================================================
     """
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP
     # Note that salinity argument is Practical Salinity, this is
     # beacuse the major ionic components of seawater related to Cl
     # are what affect the solubility of non-electrolytes in seawater.
 
-    y = np.log((25+K0 - pt)/(K0 + pt))
+    y = _gg_y(pt)
     # pt is the temperature in degress C on the ITS-90 scale
 
-    # The coefficents below are from Table 4 of Hamme and Emerson (2004)
-    a =  (2.18156, 1.29108, 2.12504)
-    b = (-5.94737e-3, -5.13896e-3)
-
-    # umol kg-1 for consistency with other gases
-    Nesol = np.exp(a[0] + y * (a[1] + a[2] * y) + x * (b[0] + b[1] * y)) / 1e3
+    # umol kg-1 for consistency with other gases, via _NE_A_UMOL
+    Nesol = _gg_sol(x, y, _NE_A_UMOL, _NE_B)
     return Nesol
 
 @match_args_return
@@ -370,7 +596,7 @@ def Nesol(SA,CT,p,long,lat):
     return Nesol_SP_pt(SP,pt)
 
 @match_args_return
-def Arsol_SP_pt(SP,pt):
+def Arsol_SP_pt(SP,pt,*,dtype=None):
     """
      Arsol_SP_pt                              solubility of Ar in seawater
     ==========================================================================
@@ -392,6 +618,8 @@ def Arsol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
       SP & pt need to have the same dimensions.
 
@@ -416,21 +644,20 @@ def Arsol_SP_pt(SP,pt):
     ==========================================================================
     """
 
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP
     # Note that salinity argument is Practical Salinity, this is
     # beacuse the major ionic components of seawater related to Cl
     # are what affect the solubility of non-electrolytes in seawater.
     #pt68 = pt * 1.00024     # pt68 is the potential temperature in degress C on
               # the 1968 International Practical Temperature Scale IPTS-68.
-    y = np.log((25+K0 - pt)/(K0 + pt))
+    y = _gg_y(pt)
     # pt is the temperature in degress C on the ITS-90 scale
 
-    # The coefficents below are from Table 4 of Hamme and Emerson (2004)
-    a =  (2.79150, 3.17609, 4.13116, 4.90379)
-    b = (-6.96233e-3, -7.66670e-3, -1.16888e-2)
-
-    Arsol = np.exp(a[0] + y * (a[1] + y * (a[2] + a[3] * y)) + x * \
-                   (b[0] + y *(b[1] + b[2] *y )))
+    Arsol = _gg_sol(x, y, _AR_A, _AR_B)
     return Arsol
 
 @match_args_return
@@ -444,7 +671,7 @@ def Arsol(SA,CT,p,long,lat):
     return Arsol_SP_pt(SP,pt)
 
 @match_args_return
-def Krsol_SP_pt(SP,pt):
+def Krsol_SP_pt(SP,pt,*,dtype=None,_terms=None):
     """
      Krsol_SP_pt                              solubility of Kr in seawater
     ==========================================================================
@@ -466,6 +693,8 @@ def Krsol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
       SP & pt need to have the same dimensions.
 
@@ -489,25 +718,17 @@ def Krsol_SP_pt(SP,pt):
 
     ==========================================================================
     """
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP        # Note that salinity argument is Practical Salinity, this is
              # beacuse the major ionic components of seawater related to Cl
           # are what affect the solubility of non-electrolytes in seawater.
 
-    pt68 = pt * 1.00024 # pt68 is the potential temperature in degress C on
-                  # the 1968 International Practical Temperature Scale IPTS-68.
-    y = pt68 + K0
-    y_100 = y * 1e-2
-
-    # Table 2 (Weiss and Kyser, 1978)
-    a = (-112.6840, 153.5817, 74.4690, -10.0189)
-    b = (-0.011213, -0.001844, 0.0011201)
-
-    Krsol_mL = np.exp(a[0] + a[1] * 100/y + a[2] * np.log(y_100) + a[3] * \
-                      y_100 + x * (b[0] + y_100 * (b[1] + b[2] * y_100)))
-
-    # mL/kg to umol/kg for Kr (1/22.3511e-3)
-    #Molar volume at STP (Dymond and Smith, 1980).
-    Krsol = Krsol_mL * 4.474052731185490e1
+    # umol/kg, the mL/kg to umol/kg conversion for Kr (1/22.3511e-3, molar
+    # volume at STP of Dymond and Smith, 1980) is folded into _KR_A_UMOL
+    Krsol = _weiss_sol(x, pt, _KR_A_UMOL, _KR_B, _terms)
     return Krsol
 
 @match_args_return
@@ -522,7 +743,7 @@ def Krsol(SA,CT,p,long,lat):
 
 
 @match_args_return
-def Xesol_SP_pt(SP,pt):
+def Xesol_SP_pt(SP,pt,*,dtype=None):
     """
      Xesol_SP_pt                              solubility of Xe in seawater
     ==========================================================================
@@ -540,6 +761,8 @@ def Xesol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
       SP & pt need to have the same dimensions.
 
@@ -556,20 +779,20 @@ def Xesol_SP_pt(SP,pt):
 
     ==========================================================================
     """
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP        # Note that salinity argument is Practical Salinity, this is
              # beacuse the major ionic components of seawater related to Cl
           # are what affect the solubility of non-electrolytes in seawater.
     pt68 = pt * 1.00024     # pt68 is the potential temperature in degress C on
               # the 1968 International Practical Temperature Scale IPTS-68.
-    y = np.log((25+K0 - pt68)/(K0 + pt68))
+    y = _gg_y(pt68)
     # pt is the temperature in degress C on the ITS-90 scale
 
 
-    #  from fit procedure of Hamme and Emerson 2004 to Wood and Caputi data
-    a = (-7.48588, 5.08763, 4.22078)
-    b = (-8.17791e-3, -1.20172e-2)
-
-    Xesol = np.exp(a[0] + y * (a[1] + y * a[2]) + x * (b[0] + y *b[1]))
+    Xesol = _gg_sol(x, y, _XE_A, _XE_B)
 
     return Xesol
 
@@ -585,7 +808,7 @@ def Xesol(SA,CT,p,long,lat):
 
 
 @match_args_return
-def N2sol_SP_pt(SP,pt):
+def N2sol_SP_pt(SP,pt,*,dtype=None):
     """
      N2sol_SP_pt                              solubility of N2 in seawater
     ==========================================================================
@@ -607,6 +830,8 @@ def N2sol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
       SP & pt need to have the same dimensions.
 
@@ -632,20 +857,19 @@ def N2sol_SP_pt(SP,pt):
 
     ==========================================================================
 """
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP
     # Note that salinity argument is Practical Salinity, this is
     # beacuse the major ionic components of seawater related to Cl
     # are what affect the solubility of non-electrolytes in seawater.
 
-    y = np.log((25+K0 - pt)/(K0 + pt))
+    y = _gg_y(pt)
     # pt is the temperature in degress C on the ITS-90 scale
 
-    # The coefficents below are from Table 4 of Hamme and Emerson (2004)
-    a = (6.42931, 2.92704, 4.32531, 4.69149)
-    b = (-7.44129e-3, -8.02566e-3, -1.46775e-2)
-
-    N2sol = np.exp(a[0] + y * (a[1] + y * (a[2] + a[3] * y)) + x * \
-                   (b[0] + y *(b[1] + b[2] *y )))
+    N2sol = _gg_sol(x, y, _N2_A, _N2_B)
     return N2sol
 
 @match_args_return
@@ -659,7 +883,7 @@ def N2sol(SA,CT,p,long,lat):
     return N2sol_SP_pt(SP,pt)
 
 @match_args_return
-def N2Osol_SP_pt(SP,pt):
+def N2Osol_SP_pt(SP,pt,*,dtype=None,_terms=None):
     """
      gsw_N2Osol_SP_pt                            solubility of N2O in seawater
     ==========================================================================
@@ -669,9 +893,9 @@ def N2Osol_SP_pt(SP,pt):
 
      DESCRIPTION:
       Calculates the nitrous oxide, N2O, concentration expected at equilibrium
-      with air at an Absolute Pressure of 101325 Pa (sea pressure of 0 dbar)
-      including saturated water vapor  This function uses the solubility
-      coefficients as listed in Hamme and Emerson (2004).
+      with a pure N2O pressure of 101325 Pa (1.0 atm). This function uses the
+      solubility coefficients (K0) listed in Table 2 of Weiss and Price
+      (1980). The moist air correction to F is not applied.
 
       Note that this algorithm has not been approved by IOC and is not work
       from SCOR/IAPSO Working Group 127. It is included in the GSW
@@ -681,12 +905,13 @@ def N2Osol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
       SP & pt need to have the same dimensions.
 
      OUTPUT:
-      N2Osol = K' solubility of nitrous oxide                 mol kg-1 atm-1 ]
-              (solubility in moist air at total pressure of 1 atm)
+      N2Osol = K0 solubility of nitrous oxide at 1 atm dry   [ mol L-1 atm-1 ]
 
      AUTHOR:  Rich Pawlowicz, Paul Barker and Trevor McDougall
                                                           [ help@teos-10.org ]
@@ -707,40 +932,18 @@ def N2Osol_SP_pt(SP,pt):
 
     ==========================================================================
     """
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP        # Note that salinity argument is Practical Salinity, this is
              # beacuse the major ionic components of seawater related to Cl
           # are what affect the solubility of non-electrolytes in seawater.
 
-    pt68 = pt * 1.00024 # pt68 is the potential temperature in degress C on
-                  # the 1968 International Practical Temperature Scale IPTS-68.
-    y = pt68 + K0
-    y_100 = y * 1e-2
-
-    # The coefficents below are from Table 2 of Weiss and Price (1980)
-    # These coefficients are for mol L-1 atm-1
-
-
-    a = (-62.7062, 97.3066, 24.1406)
-    b = (-0.058420, 0.033193, -0.0051313)
-
-    #a = [-165.8806, 222.8743, 92.0792, -1.48425]
-    #b = [-0.056235, 0.031619, -0.0048472]
-
-    # These coefficents below are from Table 2 of Weiss and Price (1980)
-    # These coefficients are for mol kg-1 atm-1
-    # a = [-168.2459, 226.0894, 93.2817, -1.48693]
-    # b = [-0.060361 + 0.033765, -0.0051862]
-
-    # Moist air correction at 1 atm.
-    # fitted the vapor pressure of water as given by Goff and Gratch (1946),
-    # and the vapor pressure lowering by sea salt as given by Robinson (1954),
-    # to a polynomial in temperature and salinity:
-
-    #m = [24.4543, 67.4509, 4.8489, 0.000544]
+    # Moist air correction at 1 atm (not applied, see _N2O_M)
     #ph2odP = np.exp(m[0] - m[1]*100/y - m[2] * np.log(y_100) - m[3] * x)
 
-    N2Osol = np.exp(a[0] + a[1] * 100/y + a[2] * np.log(y_100) + x * \
-                     (b[0] + y_100 * (b[1] + b[2] * y_100)))
+    N2Osol = _weiss_sol(x, pt, _N2O_A, _N2O_B, _terms)
     return N2Osol
 
 @match_args_return
@@ -754,7 +957,7 @@ def N2Osol(SA,CT,p,long,lat):
     return N2Osol_SP_pt(SP,pt)
 
 @match_args_return
-def CO2sol_SP_pt(SP,pt):
+def CO2sol_SP_pt(SP,pt,*,dtype=None,_terms=None):
     """
      CO2sol_SP_pt            solubility of CO2 in seawater for 1 atm moist air
     ==========================================================================
@@ -773,6 +976,8 @@ def CO2sol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
       SP & pt need to have the same dimensions.
 
@@ -793,24 +998,15 @@ def CO2sol_SP_pt(SP,pt):
 
     ==========================================================================
     """
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP        # Note that salinity argument is Practical Salinity, this is
              # beacuse the major ionic components of seawater related to Cl
           # are what affect the solubility of non-electrolytes in seawater.
 
-    pt68 = pt * 1.00024 # pt68 is the potential temperature in degress C on
-                  # the 1968 International Practical Temperature Scale IPTS-68.
-    y = pt68 + K0
-    y_100 = y * 1e-2
-
-    # Table 6 (Weiss and Price, 1980)
-    #a = [-162.8301, 218.2968, 90.9241, -1.47696]
-    #b = [0.025695, -0.025225, 0.0049867]
-    # Table 1 (Weiss 1974, Marine Chem)
-    a = (-58.0931, 90.5069, 22.2940)
-    b = (0.027766, -0.025888, 0.0050578)
-
-    CO2sol = np.exp(a[0] + a[1] * 100/y + a[2] * np.log(y_100) +  x * \
-                    (b[0] + b[1] * y_100 + b[2] * y_100**2))
+    CO2sol = _weiss_sol(x, pt, _CO2_A, _CO2_B, _terms)
     return CO2sol
 
 @match_args_return
@@ -824,7 +1020,7 @@ def CO2sol(SA,CT,p,long,lat):
     return CO2sol_SP_pt(SP,pt)
 
 @match_args_return
-def CH4sol_SP_pt(SP,pt):
+def CH4sol_SP_pt(SP,pt,*,dtype=None,_terms=None):
     """
      CH4sol_SP_pt            solubility of CH4 in seawater  [mol L-1 atm-1]
     ==========================================================================
@@ -844,6 +1040,8 @@ def CH4sol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
       SP & pt need to have the same dimensions.
 
@@ -865,24 +1063,17 @@ def CH4sol_SP_pt(SP,pt):
 
     ==========================================================================
     """
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP        # Note that salinity argument is Practical Salinity, this is
              # beacuse the major ionic components of seawater related to Cl
           # are what affect the solubility of non-electrolytes in seawater.
 
-    pt68 = pt * 1.00024 # pt68 is the potential temperature in degress C on
-                  # the 1968 International Practical Temperature Scale IPTS-68.
-    y = pt68 + K0
-    y_100 = y * 1e-2
-
-    # Table 1 in Weisenburg and Guinasso 1979
-    a = (-68.8862, 101.4956, 28.7314)
-    b = (-0.076146, 0.043970, -0.0068672)
-
-    # Bunsen solubility in cc gas @STP / mL H2O atm-1
-    CH4_beta = np.exp(a[0] + a[1] * 100/y + a[2] * np.log(y_100) +  x * \
-                    (b[0] + b[1] * y_100 + b[2] * y_100**2))
-    # Divide by gas virial volume to get mol L-1 atm-1
-    CH4sol = CH4_beta / mol_vol(gas='CH4')
+    # Bunsen solubility in cc gas @STP / mL H2O atm-1 divided by gas virial
+    # volume to get mol L-1 atm-1, folded into _CH4_A_MOL
+    CH4sol = _weiss_sol(x, pt, _CH4_A_MOL, _CH4_B, _terms)
     return CH4sol
 
 @match_args_return
@@ -896,7 +1087,7 @@ def CH4sol(SA,CT,p,long,lat):
     return CH4sol_SP_pt(SP,pt)
 
 @match_args_return
-def COsol_SP_pt(SP,pt):
+def COsol_SP_pt(SP,pt,*,dtype=None,_terms=None):
     """
      COsol_SP_pt            solubility of CO in seawater  [mol L-1 atm-1]
     ==========================================================================
@@ -916,6 +1107,8 @@ def COsol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
       SP & pt need to have the same dimensions.
 
@@ -937,22 +1130,16 @@ def COsol_SP_pt(SP,pt):
 
     ==========================================================================
     """
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP        # Note that salinity argument is Practical Salinity, this is
              # beacuse the major ionic components of seawater related to Cl
           # are what affect the solubility of non-electrolytes in seawater.
 
-    pt68 = pt * 1.00024 # pt68 is the potential temperature in degress C on
-                  # the 1968 International Practical Temperature Scale IPTS-68.
-    y = pt68 + K0
-    y_100 = y * 1e-2
-
-    # Table 1 in Weisenburg and Guinasso 1979
-    a = (-47.6148, 69.5068, 18.7397)
-    b = (0.045657, -0.040721, 0.0079700)
-
     # Bunsen solubility in cc gas @STP / mL H2O atm-1
-    CO_beta = np.exp(a[0] + a[1] * 100/y + a[2] * np.log(y_100) +  x * \
-                    (b[0] + b[1] * y_100 + b[2] * y_100**2))
+    CO_beta = _weiss_sol(x, pt, _CO_A, _CO_B, _terms)
     # Divide by gas virial volume to get mol L-1 atm-1
     COsol = CO_beta / mol_vol(gas='CO')
     return COsol
@@ -968,7 +1155,7 @@ def COsol(SA,CT,p,long,lat):
     return COsol_SP_pt(SP,pt)
 
 @match_args_return
-def H2sol_SP_pt(SP,pt):
+def H2sol_SP_pt(SP,pt,*,dtype=None,_terms=None):
     """
      H2sol_SP_pt            solubility of H2 in seawater  [mol L-1 atm-1]
     ==========================================================================
@@ -988,6 +1175,8 @@ def H2sol_SP_pt(SP,pt):
       SP  =  Practical Salinity  (PSS-78)                         [ unitless ]
       pt  =  potential temperature (ITS-90) referenced               [ deg C ]
              to one standard atmosphere (0 dbar).
+      dtype = optional floating dtype for the calculation, e.g. np.float32
+             for large model grids (default keeps float64)
 
       SP & pt need to have the same dimensions.
 
@@ -1009,24 +1198,17 @@ def H2sol_SP_pt(SP,pt):
 
     ==========================================================================
     """
+    if dtype is not None:
+        SP = SP.astype(dtype)
+        pt = pt.astype(dtype)
+
     x = SP        # Note that salinity argument is Practical Salinity, this is
              # beacuse the major ionic components of seawater related to Cl
           # are what affect the solubility of non-electrolytes in seawater.
 
-    pt68 = pt * 1.00024 # pt68 is the potential temperature in degress C on
-                  # the 1968 International Practical Temperature Scale IPTS-68.
-    y = pt68 + K0
-    y_100 = y * 1e-2
-
-    # Table 1 in Weisenburg and Guinasso 1979
-    a = (-47.8948, 65.0368, 20.1709)
-    b = (-0.082225, 0.049564, -0.0078689)
-
-    # Bunsen solubility in cc gas @STP / mL H2O atm-1
-    H2_beta = np.exp(a[0] + a[1] * 100/y + a[2] * np.log(y_100) +  x * \
-                    (b[0] + b[1] * y_100 + b[2] * y_100**2))
-    # Divide by gas virial volume to get mol L-1 atm-1
-    H2sol = H2_beta / mol_vol(gas='H2')
+    # Bunsen solubility in cc gas @STP / mL H2O atm-1 divided by gas virial
+    # volume to get mol L-1 atm-1, folded into _H2_A_MOL
+    H2sol = _weiss_sol(x, pt, _H2_A_MOL, _H2_B, _terms)
     return H2sol
 
 @match_args_return
@@ -1040,6 +1222,164 @@ def H2sol(SA,CT,p,long,lat):
     return H2sol_SP_pt(SP,pt)
 
 
+# gas-specific solubility functions of (SP,pt); CO is left out as mol_vol
+# has no molar volume for it
+_SP_PT_DISPATCH = {'O2': O2sol_SP_pt,
+                   'He': Hesol_SP_pt,
+                   'Ne': Nesol_SP_pt,
+                   'Ar': Arsol_SP_pt,
+                   'Kr': Krsol_SP_pt,
+                   'Xe': Xesol_SP_pt,
+                   'N2': N2sol_SP_pt,
+                   'N2O': N2Osol_SP_pt,
+                   'CO2': CO2sol_SP_pt,
+                   'CH4': CH4sol_SP_pt,
+                   'H2': H2sol_SP_pt}
+
+
+def _stack_coefs(coefs):
+    """
+    Zero pad a sequence of coefficient tuples to a common length and stack
+    them as the columns of an array.
+    """
+    n = max(len(c) for c in coefs)
+    return np.array([tuple(c) + (0.0,) * (n - len(c)) for c in coefs]).T
+
+
+# Garcia and Gordon form gases: a, b and c coefficients and the factor
+# taking pt to the temperature scale of the fit, IPTS-68 for O2 and Xe and
+# ITS-90 for Ne, Ar and N2
+_GG_COEFS = {'O2': (_O2_A, _O2_B, _O2_C, 1.00024),
+             'Xe': (_XE_A, _XE_B, 0.0, 1.00024),
+             'Ne': (_NE_A_UMOL, _NE_B, 0.0, 1.0),
+             'Ar': (_AR_A, _AR_B, 0.0, 1.0),
+             'N2': (_N2_A, _N2_B, 0.0, 1.0)}
+
+# Garcia and Gordon form gases that solubilities() evaluates together, in
+# groups sharing the scaled temperature y. Each group holds its temperature
+# scale factor, gas names, stacked a and b coefficients and c coefficients.
+_GG_GROUPS = []
+for _scale, _gases in ((1.00024, ('O2','Xe')), (1.0, ('Ne','Ar','N2'))):
+    _a, _b, _c, _ = zip(*(_GG_COEFS[g] for g in _gases))
+    _GG_GROUPS.append((_scale, _gases, _stack_coefs(_a), _stack_coefs(_b),
+                       np.array(_c)))
+del _scale, _gases, _a, _b, _c, _
+
+# Weiss form gases, which solubilities() evaluates on shared _weiss_terms
+_WEISS_GASES = ('He','Kr','N2O','CO2','CH4','H2')
+
+
+def solubilities(SA,CT,p,long,lat,*,gases=('O2','N2','Ar','He','Ne','Kr', \
+                                             'Xe','N2O','CO2'),dtype=None):
+    """
+     solubilities    Solubility of several gases from absolute salinity and
+                     conservative temperature
+    ==========================================================================
+
+     USAGE:
+      sols = sol.solubilities(SA,CT,p,long,lat,gases=('O2','Ar','N2'))
+
+     DESCRIPTION:
+      Calls the gas specific *sol_SP_pt function for each gas in gases,
+      converting SA and CT to SP and pt only once rather than once per gas
+      as the individual SA-CT wrappers (O2sol, Arsol, ...) do. Gases of the
+      Garcia and Gordon form (O2, Xe, Ne, Ar and N2) that share a
+      temperature scale are evaluated together in one stacked array, and
+      the temperature terms of the Weiss form gases are computed once.
+
+     OUTPUT:
+      dict of solubilities keyed by gas, in the units of each *sol_SP_pt,
+      computed in dtype if given (e.g. np.float32)
+
+    ==========================================================================
+    """
+    for gas in gases:
+        if gas not in _SP_PT_DISPATCH:
+            raise ValueError(gas + " is not supported. Must be one of " + \
+                             ", ".join(_SP_PT_DISPATCH))
+    SP = SP_from_SA(SA,p,long,lat)
+    pt = pt_from_CT(SA,CT)
+    if dtype is not None:
+        SP = np.asanyarray(SP).astype(dtype)
+        pt = np.asanyarray(pt).astype(dtype)
+
+    # the stacked kernels work on plain arrays, with masked values as NaN
+    # and the result masked again, as match_args_return does per gas
+    ismasked = np.ma.isMaskedArray(SP) or np.ma.isMaskedArray(pt)
+    SP_nan = masked_to_nan(SP)
+    pt_nan = masked_to_nan(pt)
+
+    sols = {}
+    for scale, group, A, B, C in _GG_GROUPS:
+        idx = [i for i, gas in enumerate(group) if gas in gases]
+        if len(idx) < 2:
+            continue
+        t = pt_nan * scale if scale != 1.0 else pt_nan
+        y = _gg_y(t)
+        stack = _multi_gas_sol(SP_nan, y, A[:,idx], B[:,idx], C[idx])
+        if ismasked:
+            stack = np.ma.masked_invalid(stack)
+        for i, gas_sol in zip(idx, stack):
+            sols[group[i]] = gas_sol if gas_sol.ndim else gas_sol[()]
+    weiss = [gas for gas in gases if gas in _WEISS_GASES]
+    if len(weiss) > 1:
+        terms = _weiss_terms(pt_nan)
+        for gas in weiss:
+            sols[gas] = _SP_PT_DISPATCH[gas](SP,pt,dtype=dtype,_terms=terms)
+    return {gas: sols[gas] if gas in sols else
+            _SP_PT_DISPATCH[gas](SP,pt,dtype=dtype) for gas in gases}
+
+
+def make_sol_at_SP(SP,*,gas=None):
+    """
+     make_sol_at_SP    Solubility function of pt alone at a fixed salinity
+    ==========================================================================
+
+     USAGE:
+      O2sol_35 = sol.make_sol_at_SP(35,gas='O2')
+      O2sol = O2sol_35(pt)
+
+     DESCRIPTION:
+      Returns a function of pt equal to the gas specific *sol_SP_pt at the
+      fixed Practical Salinity SP, e.g. for climatological or freshwater
+      (SP = 0) calculations over many temperatures. The salinity terms
+      x*B(y) + c*x^2 of the Garcia and Gordon form are folded into the
+      temperature polynomial once, so each call evaluates a single
+      polynomial in y.
+
+     INPUT:
+      SP  =  Practical Salinity  (PSS-78), a scalar                [ unitless ]
+      gas =  String abbreviation for gas (O2,Ne,Ar,Xe or N2)
+
+     OUTPUT:
+      function of pt (ITS-90, deg C) returning the solubility in the units
+      of the gas specific *sol_SP_pt
+
+    ==========================================================================
+    """
+    if gas not in _GG_COEFS:
+        raise ValueError(str(gas) + " is not supported. Must be one of " + \
+                         ", ".join(_GG_COEFS))
+    a, b, c, scale = _GG_COEFS[gas]
+    SP = float(SP)
+    b = tuple(b) + (0.0,) * (len(a) - len(b))
+    a_SP = [ai + SP * bi for ai, bi in zip(a, b)]
+    a_SP[0] += c * SP * SP
+    a_SP = tuple(a_SP)
+
+    @match_args_return
+    def sol_at_SP(pt):
+        y = _gg_y(pt * scale if scale != 1.0 else pt)
+        if type(y) is float:
+            return np.float64(math.exp(_horner_scalar(y, a_SP)))
+        sol = _horner(y, a_SP, np.empty(y.shape, dtype=y.dtype))
+        np.exp(sol, out=sol)
+        return sol if sol.ndim else sol[()]
+
+    sol_at_SP.__doc__ = ("%s solubility at SP = %g as a function of pt"
+                         % (gas, SP))
+    return sol_at_SP
+
 
 def air_mol_fract(gas=None):
     g_up = gas.upper()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gas solubility on the GPU with CuPy
+
+Each *sol_SP_pt function here takes CuPy arrays of SP and pt and evaluates
+the same fit as its counterpart in gasex.sol in a single fused elementwise
+kernel, one read of SP and pt and one write of the result per element. The
+kernels are generated from the coefficients in gasex.sol. Intended for
+model or reanalysis grids large enough that the NumPy kernels are limited
+by memory bandwidth.
+
+CuPy is an optional dependency, needed only by this module.
+
+@author: d.nicholson
+"""
+
+import cupy as cp
+from gasex.phys import K0 as K0
+from gasex import sol
+
+__all__ = ['O2sol_SP_pt','Hesol_SP_pt','Nesol_SP_pt','Arsol_SP_pt', \
+           'Krsol_SP_pt','Xesol_SP_pt','N2sol_SP_pt','N2Osol_SP_pt', \
+           'CO2sol_SP_pt','CH4sol_SP_pt','H2sol_SP_pt']
+
+# Weiss form gases with their a and b coefficients, in the units of the
+# gasex.sol functions (CO has no molar volume there and is left out)
+_WEISS_COEFS = {'He': (sol._HE_A_UMOL, sol._HE_B),
+                'Kr': (sol._KR_A_UMOL, sol._KR_B),
+                'N2O': (sol._N2O_A, sol._N2O_B),
+                'CO2': (sol._CO2_A, sol._CO2_B),
+                'CH4': (sol._CH4_A_MOL, sol._CH4_B),
+                'H2': (sol._H2_A_MOL, sol._H2_B)}
+
+
+def _horner_src(y, c):
+    """CUDA source of the polynomial sum(c[i] * y**i) by Horner's rule."""
+    src = '%r' % c[-1]
+    for ci in c[-2::-1]:
+        src = '(%s * %s + %r)' % (src, y, ci)
+    return src
+
+
+def _gg_kernel(gas):
+    """Elementwise kernel for a gas of the Garcia and Gordon (1992) form."""
+    a, b, c, scale = sol._GG_COEFS[gas]
+    src = ('double t = pt * %r; '
+           'double y = log((%r - t) / (%r + t)); '
+           'out = exp(%s + SP * (%s + %r * SP));'
+           % (scale, 25 + K0, K0, _horner_src('y', a), _horner_src('y', b),
+              c))
+    return cp.ElementwiseKernel('T SP, T pt', 'T out', src, gas + 'sol_gg')
+
+
+def _weiss_kernel(gas):
+    """Elementwise kernel for a gas of the Weiss (1970) form."""
+    a, b = _WEISS_COEFS[gas]
+    lnC = '%r + %r / y_100 + %r * log(y_100)' % tuple(a[:3])
+    if len(a) > 3:
+        lnC += ' + %r * y_100' % a[3]
+    src = ('double y_100 = pt * 1.00024e-2 + %r; '
+           'out = exp(%s + SP * %s);'
+           % (K0 * 1e-2, lnC, _horner_src('y_100', b)))
+    return cp.ElementwiseKernel('T SP, T pt', 'T out', src, gas + 'sol_weiss')
+
+
+def _make_sol(gas, kernel):
+    def sol_SP_pt(SP,pt):
+        SP = cp.asarray(SP)
+        pt = cp.asarray(pt)
+        if SP.dtype.kind != 'f':
+            SP = SP.astype(float)
+        return kernel(SP, pt.astype(SP.dtype, copy=False))
+    sol_SP_pt.__name__ = gas + 'sol_SP_pt'
+    sol_SP_pt.__doc__ = """
+    %s solubility from CuPy arrays of Practical Salinity SP and potential
+    temperature pt (ITS-90, deg C), as gasex.sol.%ssol_SP_pt. The result
+    has the floating dtype of SP.
+    """ % (gas, gas)
+    return sol_SP_pt
+
+
+O2sol_SP_pt = _make_sol('O2', _gg_kernel('O2'))
+Nesol_SP_pt = _make_sol('Ne', _gg_kernel('Ne'))
+Arsol_SP_pt = _make_sol('Ar', _gg_kernel('Ar'))
+Xesol_SP_pt = _make_sol('Xe', _gg_kernel('Xe'))
+N2sol_SP_pt = _make_sol('N2', _gg_kernel('N2'))
+Hesol_SP_pt = _make_sol('He', _weiss_kernel('He'))
+Krsol_SP_pt = _make_sol('Kr', _weiss_kernel('Kr'))
+N2Osol_SP_pt = _make_sol('N2O', _weiss_kernel('N2O'))
+CO2sol_SP_pt = _make_sol('CO2', _weiss_kernel('CO2'))
+CH4sol_SP_pt = _make_sol('CH4', _weiss_kernel('CH4'))
+H2sol_SP_pt = _make_sol('H2', _weiss_kernel('H2'))
@@ -6,8 +6,18 @@ Created on Thu Nov 30 22:03:01 2017
 @author: dnicholson
 """
 
-from gasex import sol,diff
+import importlib
+import sys
+import types
 import unittest
+from unittest import mock
+import numpy as np
+from gasex import sol,diff,phys
+
+try:
+    import cupy
+except ImportError:
+    cupy = None
 
 class TestCheckVals(unittest.TestCase):
     """
@@ -69,6 +79,96 @@ class TestCheckVals(unittest.TestCase):
         for i in range(n):
             self.assertTrue(abs(result[i]/checkvals[i] - 1) < tolx)
     
+    def test_solubilities(self):
+        """
+        Batched SA-CT solubilities match the single gas wrappers
+        """
+        tolx = 1e-12
+        SA = (35.2, 34.5, 20)
+        CT = (20, 2, 10)
+        p = (0, 100, 10)
+        result = sol.solubilities(SA,CT,p,-30,40)
+        for gas in result:
+            single = getattr(sol, gas + 'sol')(SA,CT,p,-30,40)
+            for i in range(len(SA)):
+                self.assertTrue(abs(result[gas][i]/single[i] - 1) < tolx)
+        with self.assertRaises(ValueError):
+            sol.solubilities(SA,CT,p,-30,40,gases=('O2','CO'))
+
+    def test_solubilities_masked(self):
+        """
+        Batched solubilities keep the mask of masked inputs
+        """
+        tolx = 1e-12
+        SA = np.ma.array([35., 35.], mask=[0, 1])
+        result = sol.solubilities(SA,20.,0.,-30.,30.)
+        for gas in result:
+            single = getattr(sol, gas + 'sol')(SA,20.,0.,-30.,30.)
+            self.assertTrue(np.ma.isMaskedArray(result[gas]))
+            self.assertEqual(result[gas].mask.tolist(), [False, True])
+            self.assertTrue(abs(result[gas][0]/single[0] - 1) < tolx)
+        pt = np.ma.array([20., -1e20], mask=[0, 1])
+        with mock.patch.object(sol, 'pt_from_CT', return_value=pt), \
+                np.errstate(all='raise'):
+            result = sol.solubilities(SA,20.,0.,-30.,30.,
+                                      gases=('He','Kr','CO2'))
+        self.assertEqual(result['He'].mask.tolist(), [False, True])
+
+    def test_sol_float32(self):
+        """
+        Single precision solubility agrees with double precision
+        """
+        tolx = 1e-4
+        SP = np.linspace(0, 40, 50)
+        pt = np.linspace(-2, 35, 50)
+        for f in (sol.O2sol_SP_pt, sol.Hesol_SP_pt, sol.CO2sol_SP_pt):
+            result = f(SP,pt,dtype=np.float32)
+            self.assertEqual(result.dtype, np.float32)
+            self.assertTrue(np.all(abs(result/f(SP,pt) - 1) < tolx))
+        SA = np.ma.array([35., 35.], mask=[0, 1])
+        result = sol.solubilities(SA,20.,0.,-30.,30.,dtype=np.float32)
+        for gas in result:
+            self.assertEqual(result[gas].dtype, np.float32)
+            self.assertEqual(result[gas].mask.tolist(), [False, True])
+        result = sol.solubilities(35.,20.,0.,-30.,30.,dtype=np.float32)
+        self.assertFalse(np.ma.isMaskedArray(result['O2']))
+
+    def test_sol_scalar(self):
+        """
+        Scalar inputs agree with the array path
+        """
+        tolx = 1e-14
+        for f in (sol.O2sol_SP_pt, sol.Nesol_SP_pt, sol.Krsol_SP_pt,
+                  sol.N2Osol_SP_pt):
+            result = f(35.,20.)
+            self.assertIs(type(result), np.float64)
+            self.assertTrue(abs(result/f([35.],[20.])[0] - 1) < tolx)
+        self.assertIs(type(sol.make_sol_at_SP(35, gas='O2')(20.)), np.float64)
+
+    def test_make_sol_at_SP(self):
+        """
+        Fixed salinity solubility matches the SP-pt function
+        """
+        tolx = 1e-12
+        pt = (20, 2, 10)
+        O2sol_35 = sol.make_sol_at_SP(35, gas='O2')
+        result = O2sol_35(pt)
+        check = sol.O2sol_SP_pt((35, 35, 35), pt)
+        for i in range(len(pt)):
+            self.assertTrue(abs(result[i]/check[i] - 1) < tolx)
+        with self.assertRaises(ValueError):
+            sol.make_sol_at_SP(35, gas='He')
+
+    def test_sol_transposed(self):
+        """
+        Transposed (Fortran ordered) inputs give the transposed result
+        """
+        SP = np.linspace(0, 40, 12).reshape(3, 4)
+        pt = np.linspace(-2, 35, 12).reshape(3, 4)
+        result = sol.O2sol_SP_pt(SP.T,pt.T)
+        self.assertTrue(result.flags.c_contiguous)
+        self.assertTrue(np.array_equal(result, sol.O2sol_SP_pt(SP,pt).T))
+
     def test_diff(self):
         """
         Test gas diffusion for S=35, T=20
@@ -84,8 +184,201 @@ class TestCheckVals(unittest.TestCase):
         for i in range(ng):
             result = diff.diff(35,20,gas=gases[i])
             self.assertTrue(abs(result/d_check[i] - 1) < tolx)
+
+    def test_diff_float32(self):
+        """
+        Single precision diffusivity agrees with double precision
+        """
+        tolx = 1e-5
+        SP = np.linspace(0, 40, 50)
+        pt = np.linspace(-2, 35, 50)
+        result = diff.diff(SP,pt,gas='O2',dtype=np.float32)
+        self.assertEqual(result.dtype, np.float32)
+        self.assertTrue(np.all(abs(result/diff.diff(SP,pt,gas='O2') - 1) < tolx))
+
+    def test_diff_idx(self):
+        """
+        Gas id diffusivities match diff and keep input masks
+        """
+        tolx = 1e-12
+        SP = np.ma.array([35, 34, 20], mask=[0, 1, 0])
+        pt = (20, 2, 10)
+        result = diff.diff_idx(SP,pt,[diff.GAS_LIST.index('O2')] * 3)
+        check = diff.diff(SP,pt,gas='O2')
+        self.assertTrue(np.array_equal(result.mask, check.mask))
+        self.assertTrue(np.all(abs(result/check - 1) < tolx))
+
+    def test_out(self):
+        """
+        diff, visc and schmidt write into a preallocated out
+        """
+        SP = (35, 34, 20)
+        pt = (20, 2, 10)
+        for f, kw in ((diff.diff, {'gas': 'O2'}), (phys.visc, {}),
+                      (phys.visc, {'fast': True}),
+                      (diff.schmidt, {'gas': 'O2'})):
+            out = np.empty(3)
+            self.assertIs(f(SP,pt,out=out,**kw), out)
+            self.assertTrue(np.array_equal(out, f(SP,pt,**kw)))
+            out = np.empty(())
+            result = f(35,20,out=out,**kw)
+            self.assertEqual(result, out)
+            self.assertEqual(result, f(35,20,**kw))
+        with self.assertRaises(ValueError):
+            diff.diff(SP,pt,gas='O2',out=np.empty(2))
+        with self.assertRaises(ValueError):
+            diff.diff(35,20,gas='O2',out=np.empty(3))
+        with self.assertRaises(ValueError):
+            diff.diff_grid(SP,pt,gases=('O2','N2'),out=np.empty(3))
+        with self.assertRaises(ValueError):
+            diff.schmidt(SP,pt,gas='O2',out=np.empty(2))
+
+    def test_visc_fast(self):
+        """
+        Polynomial surface density viscosity is within 0.01% of gsw
+        """
+        tolx = 1e-4
+        SP, pt = np.meshgrid(np.linspace(0, 42, 85), np.linspace(-2, 40, 85))
+        result = phys.visc(SP,pt,fast=True)
+        self.assertTrue(np.all(abs(result/phys.visc(SP,pt) - 1) < tolx))
+
+    def test_diff_per_gas(self):
+        """
+        Per-gas functions match diff
+        """
+        tolx = 1e-14
+        SP = np.linspace(0, 40, 50)
+        pt = np.linspace(-2, 35, 50)
+        for f, gas in ((diff.diff_O2, 'O2'), (diff.diff_He, 'He'),
+                       (diff.diff_CH4, 'CH4')):
+            result = f(SP,pt)
+            self.assertTrue(np.all(abs(result/diff.diff(SP,pt,gas=gas) - 1)
+                                   < tolx))
+        self.assertTrue(abs(diff.diff_O2(35,20)/diff.diff(35,20,gas='O2') - 1)
+                        < tolx)
+
+    def test_diff_invT(self):
+        """
+        A precomputed 1/(pt+273.15) gives the same diffusivity for each gas
+        """
+        tolx = 1e-14
+        SP = np.linspace(0, 40, 50)
+        pt = np.linspace(-2, 35, 50)
+        invT = 1 / (pt+273.15)
+        for gas in diff.GAS_LIST:
+            result = diff.diff(SP,pt,gas=gas,invT=invT)
+            check = diff.diff(SP,pt,gas=gas)
+            self.assertTrue(np.all(abs(result/check - 1) < tolx))
+
+    def test_vpress(self):
+        """
+        Horner form vapour pressures match the original power series
+        """
+        tolx = 1e-12
+        SP, pt = np.meshgrid(np.linspace(0, 42, 43), np.linspace(-2, 40, 43))
+        tmod = 1 - (pt + 273.15) / 647.096
+        wagner = -7.85951783*tmod + 1.84408259*tmod**1.5 - \
+            11.7866497*tmod**3 + 22.6807411*tmod**3.5 - \
+            15.9618719*tmod**4 + 1.80122502*tmod**7.5
+        vp_w = np.exp(wagner * 647.096 / (pt + 273.15)) * 22.064e6 / 101325
+        molal = 31.998 * SP / (1e3 - 1.005*SP)
+        osmotic_coeff = 0.90799 - 0.08992*(0.5*molal) + \
+            0.18458*(0.5*molal)**2 - 0.07395*(0.5*molal)**3 - \
+            0.00221*(0.5*molal)**4
+        vp_sw = vp_w * np.exp(-0.018 * osmotic_coeff * molal)
+        self.assertTrue(np.all(abs(phys.vpress_w(pt)/vp_w - 1) < tolx))
+        self.assertTrue(np.all(abs(phys.vpress_sw(SP,pt)/vp_sw - 1) < tolx))
+
+    def test_diff_unknown_gas(self):
+        """
+        Unsupported gases raise rather than returning None
+        """
+        with self.assertRaises(ValueError):
+            diff.diff(35,20,gas='N2O')
+        with self.assertRaises(ValueError):
+            diff.diff(35,20)
+
+    def test_schmidt_all(self):
+        """
+        Batched Schmidt numbers match schmidt for each gas
+        """
+        tolx = 1e-12
+        SP = (35, 34, 20)
+        pt = (20, 2, 10)
+        result = diff.schmidt_all(SP,pt)
+        for gas in diff.GAS_LIST:
+            Sc = diff.schmidt(SP,pt,gas=gas)
+            for i in range(len(SP)):
+                self.assertTrue(abs(result[gas][i]/Sc[i] - 1) < tolx)
+
+    def test_schmidt_all_masked(self):
+        """
+        Batched diffusivities and Schmidt numbers keep input masks
+        """
+        SP = np.ma.array([35, 34, 20], mask=[0, 1, 0])
+        pt = (20, 2, 10)
+        D = diff.diff_grid(SP,pt)
+        self.assertTrue(np.ma.isMaskedArray(D))
+        self.assertTrue(D.mask[:,1].all())
+        self.assertFalse(D.mask[:,[0,2]].any())
+        result = diff.schmidt_all(SP,pt)
+        for gas in diff.GAS_LIST:
+            Sc = diff.schmidt(SP,pt,gas=gas)
+            self.assertTrue(np.array_equal(result[gas].mask, Sc.mask))
     
 
 
+class _CPUElementwiseKernel:
+    """
+    Stand-in for cupy.ElementwiseKernel that runs the generated CUDA
+    expressions with numpy on the CPU
+    """
+    def __init__(self, in_params, out_params, operation, name):
+        self.lines = [line.strip().replace('double ', '', 1)
+                      for line in operation.split(';') if line.strip()]
+
+    def __call__(self, SP, pt):
+        env = {'SP': SP, 'pt': pt, 'log': np.log, 'exp': np.exp}
+        for line in self.lines:
+            exec(line, env)
+        return env['out']
+
+
+class TestSolGpu(unittest.TestCase):
+    """
+    Test the CuPy kernels of gasex.sol_gpu against gasex.sol
+    """
+    SP = np.linspace(0, 40, 12).reshape(3, 4)
+    pt = np.linspace(-2, 35, 12).reshape(3, 4)
+
+    def check_kernels(self, sol_gpu, to_numpy):
+        tolx = 1e-12
+        for name in sol_gpu.__all__:
+            result = to_numpy(getattr(sol_gpu, name)(self.SP, self.pt))
+            check = getattr(sol, name)(self.SP, self.pt)
+            self.assertTrue(np.all(abs(result/check - 1) < tolx), name)
+
+    def test_sol_gpu_expressions(self):
+        """
+        Generated kernel expressions match gasex.sol, evaluated on the CPU
+        """
+        fake_cupy = types.ModuleType('cupy')
+        fake_cupy.asarray = np.asarray
+        fake_cupy.ElementwiseKernel = _CPUElementwiseKernel
+        with mock.patch.dict(sys.modules, {'cupy': fake_cupy}):
+            sys.modules.pop('gasex.sol_gpu', None)
+            sol_gpu = importlib.import_module('gasex.sol_gpu')
+            self.check_kernels(sol_gpu, np.asarray)
+
+    @unittest.skipUnless(cupy, "cupy is not installed")
+    def test_sol_gpu(self):
+        """
+        CuPy kernels match gasex.sol on the GPU
+        """
+        sys.modules.pop('gasex.sol_gpu', None)
+        sol_gpu = importlib.import_module('gasex.sol_gpu')
+        self.check_kernels(sol_gpu, cupy.asnumpy)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -17,4 +17,5 @@ setup(name='Gasex',
       license='MIT',
       packages=['gasex'],
       install_requires=['gsw'],
+      extras_require={'gpu': ['cupy']},
       zip_safe=False)